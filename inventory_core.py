@@ -4,13 +4,24 @@ Config loading, UI strings, field metadata, row formatting,
 double-entry partner detection, learning checks, clipboard export.
 """
 
+import bisect
+import hashlib
+import os
 import re
 import subprocess
 import shutil
+import tempfile
 from datetime import date
+from functools import cached_property, lru_cache
 
 import yaml
 
+# libyaml-backed loader/dumper when available, pure-Python otherwise
+try:
+    from yaml import CSafeLoader as _YamlLoader, CSafeDumper as _YamlDumper
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader, SafeDumper as _YamlDumper
+
 
 # ============================================================
 # UI Strings — all user-facing text, configurable per language
@@ -81,6 +92,8 @@ _EN_DEFAULTS = {
         'edit_line_updated': '  Line {num} updated.',
         'edit_line_deleted': '  Line {num} deleted.',
         'save_alias_prompt': 'Save "{original}" \u2192 "{canonical}" as alias? [{yes}/{no}] ',
+        'save_aliases_header': 'Save as aliases?',
+        'save_alias_option': '"{original}" \u2192 "{canonical}"',
         'title': '=== Inventory Message Parser ===',
         'subtitle': "Paste a WhatsApp message to parse. Type 'exit' to quit.\n",
         'goodbye': 'Goodbye.',
@@ -147,37 +160,76 @@ class UIStrings:
         self.table_headers = ui.get('table_headers', _EN_DEFAULTS['table_headers'])
         self.option_letters = ui.get('option_letters', _EN_DEFAULTS['option_letters'])
         self.strings = {**_EN_DEFAULTS['strings'], **ui.get('strings', {})}
+        self._field_names_lower = {
+            field: name.lower() for field, name in self.field_display_names.items()
+        }
         self.items = config.get('items', [])
         self.aliases = config.get('aliases', {})
 
-        # Pre-build regex helpers
-        self._field_code_chars = ''.join(re.escape(c) for c in self.field_codes.keys())
-        self._delete_prefix = re.escape(self.commands['delete_prefix'])
+        self._delete_prefix = self.commands['delete_prefix']
 
-        # Reverse lookup: field code letter → internal field name
-        self._field_code_to_field = dict(self.field_codes)
+        # Lookup: field code letter → internal field name (read-only alias)
+        self._field_code_to_field = self.field_codes
+        # Reverse lookup: internal field name → its first field code letter
+        self._field_to_first_code = {}
+        for letter, field in self.field_codes.items():
+            self._field_to_first_code.setdefault(field, letter)
+
+    def match_delete(self, cmd):
+        """Row number from a delete command (e.g. x3), or None."""
+        if cmd.startswith(self._delete_prefix):
+            num = cmd[len(self._delete_prefix):]
+            if num.isdecimal():
+                return int(num)
+        return None
 
-        # Build help texts
-        self.help_text = self._build_help()
-        self.help_text_notes = self._build_help_notes()
-        self.help_text_unparseable = self._build_help_unparseable()
+    def match_field_edit(self, cmd):
+        """(row number, field) from an edit command (e.g. 3q), or None."""
+        if (len(cmd) >= 2 and cmd[-1] in self._field_code_to_field
+                and cmd[:-1].isdecimal()):
+            return int(cmd[:-1]), self._field_code_to_field[cmd[-1]]
+        return None
 
     def s(self, key, **kwargs):
-        """Get a UI string, with optional format substitution."""
+        """Get a UI string, with optional format substitution.
+
+        Zero-argument strings are returned as stored, without formatting.
+        """
         template = self.strings.get(key, key)
         if kwargs:
-            return template.format(**kwargs)
+            return template.format_map(kwargs)
         return template
 
+    # Help texts are built on first use — most reviews never ask for help
+
+    @cached_property
+    def help_text(self):
+        return self._build_help()
+
+    @cached_property
+    def help_text_notes(self):
+        return self._build_help_notes()
+
+    @cached_property
+    def help_text_unparseable(self):
+        return self._build_help_unparseable()
+
+    @cached_property
+    def unknown_command_text(self):
+        return self.s('unknown_command',
+                      example_field=self._first_field_code_for('inv_type'),
+                      example_name=self.field_name_lower('inv_type'))
+
     def field_name(self, internal_name):
         return self.field_display_names.get(internal_name, internal_name.upper())
 
+    def field_name_lower(self, internal_name):
+        """Display name as used mid-sentence in messages."""
+        return self._field_names_lower.get(internal_name, internal_name.lower())
+
     def _first_field_code_for(self, internal_name):
         """Find the letter code for a given internal field name."""
-        for letter, field in self.field_codes.items():
-            if field == internal_name:
-                return letter
-        return '?'
+        return self._field_to_first_code.get(internal_name, '?')
 
     def _build_help(self):
         c = self.commands
@@ -190,17 +242,18 @@ class UIStrings:
         # Build field code display lines
         fc_lines = []
         for letter, field in self.field_codes.items():
-            fc_lines.append(f'  {letter} = {self.field_name(field).lower()}')
+            fc_lines.append(f'  {letter} = {self.field_name_lower(field)}')
 
         lines = [
-            self.s('help_commands_header'),
-            f'  {c["confirm"]:14s} {self.s("help_confirm_desc")}',
-            f'  {c["quit"]:14s} {self.s("help_quit_desc")}',
-            f'  {c["retry"]:14s} {self.s("help_retry_desc")}',
-            f'  {"<#><field>":14s} {self.s("help_edit_desc", example=f"1{item_code}")}',
-            f'  {del_pfx + "<#>":14s} {self.s("help_delete_desc", example=f"{del_pfx}1")}',
-            f'  {c["add_row"]:14s} {self.s("help_add_desc")}',
-            f'  {c["help"]:14s} {self.s("help_help_desc")}',
+            *self._help_commands([
+                (c['confirm'], self.s('help_confirm_desc')),
+                (c['quit'], self.s('help_quit_desc')),
+                (c['retry'], self.s('help_retry_desc')),
+                ('<#><field>', self.s('help_edit_desc', example=f'1{item_code}')),
+                (del_pfx + '<#>', self.s('help_delete_desc', example=f'{del_pfx}1')),
+                (c['add_row'], self.s('help_add_desc')),
+                (c['help'], self.s('help_help_desc')),
+            ], width=14),
             '',
             self.s('help_field_codes_header'),
             *fc_lines,
@@ -211,39 +264,37 @@ class UIStrings:
             f'  {del_pfx}3   {self.s("help_delete_desc", example=f"{del_pfx}3")}',
         ]
         if self.items:
-            lines.append('')
-            lines.append(self.s('help_items_header'))
-            for item in self.items:
-                aliases_for = [a for a, canon in self.aliases.items()
-                               if canon == item]
-                if aliases_for:
-                    lines.append(f'  {item}  ({", ".join(aliases_for)})')
-                else:
-                    lines.append(f'  {item}')
+            # Reverse map once: canonical item → its aliases
+            aliases_by_item = {}
+            for a, canon in self.aliases.items():
+                aliases_by_item.setdefault(canon, []).append(a)
+            lines += ['', self.s('help_items_header')]
+            lines += [f'  {item}  ({", ".join(aliases_by_item[item])})'
+                      if item in aliases_by_item else f'  {item}'
+                      for item in self.items]
         return '\n'.join(lines)
 
-    def _build_help_notes(self):
+    def _help_commands(self, entries, width):
+        """Commands header plus one aligned line per (command, description)."""
+        return [self.s('help_commands_header'),
+                *(f'  {cmd:{width}s} {desc}' for cmd, desc in entries)]
+
+    def _shared_help_entries(self):
+        """Retry/skip/help lines common to the notes and unparseable help."""
         c = self.commands
-        edit_cmd = c.get('edit', c['retry'])
-        lines = [
-            self.s('help_commands_header'),
-            f'  {c["save_note"]:6s} {self.s("help_save_note_desc")}',
-            f'  {edit_cmd:6s} {self.s("help_retry_desc")}',
-            f'  {c["skip"]:6s} {self.s("help_skip_desc")}',
-            f'  {c["help"]:6s} {self.s("help_help_desc")}',
+        return [
+            (c.get('edit', c['retry']), self.s('help_retry_desc')),
+            (c['skip'], self.s('help_skip_desc')),
+            (c['help'], self.s('help_help_desc')),
         ]
-        return '\n'.join(lines)
+
+    def _build_help_notes(self):
+        entries = [(self.commands['save_note'], self.s('help_save_note_desc')),
+                   *self._shared_help_entries()]
+        return '\n'.join(self._help_commands(entries, width=6))
 
     def _build_help_unparseable(self):
-        c = self.commands
-        edit_cmd = c.get('edit', c['retry'])
-        lines = [
-            self.s('help_commands_header'),
-            f'  {edit_cmd:6s} {self.s("help_retry_desc")}',
-            f'  {c["skip"]:6s} {self.s("help_skip_desc")}',
-            f'  {c["help"]:6s} {self.s("help_help_desc")}',
-        ]
-        return '\n'.join(lines)
+        return '\n'.join(self._help_commands(self._shared_help_entries(), width=6))
 
 
 # ============================================================
@@ -252,19 +303,57 @@ class UIStrings:
 
 def load_config(path):
     with open(path, 'r', encoding='utf-8') as f:
-        return yaml.safe_load(f)
+        return yaml.load(f, Loader=_YamlLoader)
+
+
+def config_fingerprint(config):
+    """Digest of the config's contents, for skipping no-op saves."""
+    return hashlib.blake2b(repr(config).encode('utf-8'), digest_size=16).digest()
 
 
 def save_config(config, path):
     """Save config to YAML, stripping any sheet-managed fields."""
+    invalidate_config_memo(config)
     if path is None:
         return
     to_save = {k: v for k, v in config.items() if k != '_sheet_fields'}
     for field in config.get('_sheet_fields', set()):
         to_save.pop(field, None)
-    with open(path, 'w', encoding='utf-8') as f:
-        yaml.dump(to_save, f, default_flow_style=False, sort_keys=False,
-                  allow_unicode=True)
+    data = yaml.dump(to_save, Dumper=_YamlDumper, default_flow_style=False,
+                     sort_keys=False, allow_unicode=True)
+    # Write through symlinks to the real file, keeping the link itself
+    target = os.path.realpath(path)
+    try:
+        with open(target, encoding='utf-8') as f:
+            if f.read() == data:
+                return
+    except (OSError, UnicodeDecodeError):
+        pass
+    if not os.path.exists(target):
+        with open(target, 'w', encoding='utf-8') as f:
+            f.write(data)
+        return
+    # Write a uniquely named sibling and swap it in, so a crash never
+    # leaves half a file and concurrent saves don't share a temp file
+    with tempfile.NamedTemporaryFile(
+            'w', encoding='utf-8', dir=os.path.dirname(target),
+            prefix=os.path.basename(target) + '.', suffix='.tmp',
+            delete=False) as f:
+        tmp_path = f.name
+        try:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        except BaseException:
+            f.close()
+            os.unlink(tmp_path)
+            raise
+    try:
+        shutil.copymode(target, tmp_path)
+        os.replace(tmp_path, target)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
 
 
 def load_config_with_sheets(path):
@@ -304,6 +393,7 @@ def save_learned_alias(config, config_path, sheets_client, alias, target):
     if 'aliases' not in config:
         config['aliases'] = {}
     config['aliases'][alias] = target
+    invalidate_config_memo(config)
 
     if 'aliases' in config.get('_sheet_fields', set()):
         gs = config.get('google_sheets', {})
@@ -329,6 +419,7 @@ def save_learned_conversion(config, config_path, sheets_client,
     if item not in config['unit_conversions']:
         config['unit_conversions'][item] = {}
     config['unit_conversions'][item][container] = factor
+    invalidate_config_memo(config)
 
     if 'unit_conversions' in config.get('_sheet_fields', set()):
         gs = config.get('google_sheets', {})
@@ -342,12 +433,47 @@ def save_learned_conversion(config, config_path, sheets_client,
         save_config(config, config_path)
 
 
+# ============================================================
+# Per-config memo
+# ============================================================
+
+# Values derived from a config (closed-set options, fuzzy-match targets,
+# the web config payload): id(config) → (config, {key: value}). The config
+# itself is kept in the entry so a recycled id can't return another config's
+# values, which also keeps it alive until invalidate_config_memo() drops it.
+_config_memo = {}
+
+
+def config_memo(config, key, build):
+    """Return build() for this config and key, computed once per config.
+
+    The memo can't see in-place changes: whoever changes the config must call
+    invalidate_config_memo() afterwards (save_config and the learned
+    alias/conversion savers do). Callers must not mutate the returned value.
+    """
+    entry = _config_memo.get(id(config))
+    if entry is None or entry[0] is not config:
+        entry = (config, {})
+        _config_memo[id(config)] = entry
+    values = entry[1]
+    if key not in values:
+        values[key] = build()
+    return values[key]
+
+
+def invalidate_config_memo(config):
+    """Forget everything memoized for this config, releasing the entry."""
+    _config_memo.pop(id(config), None)
+
+
 # ============================================================
 # Field metadata
 # ============================================================
 
 _DEFAULT_FIELD_ORDER = ['date', 'inv_type', 'qty', 'trans_type', 'vehicle_sub_unit', 'batch', 'notes']
 
+_DEFAULT_REQUIRED_FIELDS = ['trans_type', 'vehicle_sub_unit']
+
 _DEFAULT_FIELD_OPTIONS = {
     'inv_type': 'items',
     'trans_type': 'transaction_types',
@@ -368,11 +494,19 @@ def get_field_order(config):
 
 def get_required_fields(config):
     """Get list of required field names from config, with fallback."""
-    return config.get('required_fields', ['trans_type', 'vehicle_sub_unit'])
+    return config.get('required_fields', _DEFAULT_REQUIRED_FIELDS)
 
 
 def get_closed_set_options(field, config):
-    """Get the list of options for a closed-set field."""
+    """Get the list of options for a closed-set field.
+
+    Built once per config and field; callers must not mutate the list.
+    """
+    return config_memo(config, ('options', field),
+                       lambda: _build_closed_set_options(field, config))
+
+
+def _build_closed_set_options(field, config):
     field_options = config.get('field_options', _DEFAULT_FIELD_OPTIONS)
     config_key = field_options.get(field)
 
@@ -399,6 +533,25 @@ def get_closed_set_options(field, config):
     return []
 
 
+# ============================================================
+# Fuzzy-match targets
+# ============================================================
+
+
+def get_entity_targets(config):
+    """Items + locations, the candidates for an alias target (cached)."""
+    return config_memo(
+        config, 'entities',
+        lambda: config.get('items', []) + config.get('locations', []))
+
+
+def get_container_targets(config):
+    """All known container names, the candidates for a conversion (cached)."""
+    from inventory_parser import get_all_containers
+    return config_memo(
+        config, 'containers', lambda: list(get_all_containers(config)))
+
+
 # ============================================================
 # Row formatting
 # ============================================================
@@ -425,6 +578,17 @@ def row_has_warning(row, config=None):
             or row.get('vehicle_sub_unit') is None)
 
 
+def incomplete_rows(rows, config):
+    """Return 1-based numbers of rows with an unknown item or missing field."""
+    required = get_required_fields(config)
+    incomplete = []
+    for n, row in enumerate(rows, 1):
+        get = row.get
+        if get('inv_type') == '???' or any(get(f) is None for f in required):
+            incomplete.append(n)
+    return incomplete
+
+
 def _format_cell(row, field):
     if field == 'date':
         return format_date(row.get('date'))
@@ -442,13 +606,19 @@ def _format_cell(row, field):
     return val if val is not None else '???'
 
 
-def _row_to_cells(i, row, config=None):
-    warn = '\u26a0 ' if row_has_warning(row, config) else ''
+def _rows_to_cells(rows, config=None):
+    """Display cells per row: ⚠-flagged row number, then each field.
+
+    Config lookups happen once per table rather than once per row.
+    """
+    required = get_required_fields(config) if config else _DEFAULT_REQUIRED_FIELDS
     field_order = get_field_order(config) if config else _DEFAULT_FIELD_ORDER
-    cells = [f'{warn}{i + 1}']
-    for field in field_order:
-        cells.append(_format_cell(row, field))
-    return cells
+    table = []
+    for i, row in enumerate(rows):
+        get = row.get
+        warn = '\u26a0 ' if any(get(f) is None for f in required) else ''
+        table.append((f'{warn}{i + 1}', *(_format_cell(row, f) for f in field_order)))
+    return table
 
 
 def format_rows_for_clipboard(rows, config=None):
@@ -477,35 +647,40 @@ def format_rows_for_clipboard(rows, config=None):
 # Pluggable clipboard — web interface overrides this
 _clipboard_fn = None
 
+# System clipboard commands, in order of preference
+_CLIPBOARD_COMMANDS = [
+    # WSL: clip.exe can't handle Unicode; use PowerShell Set-Clipboard
+    ['powershell.exe', '-NoProfile', '-NonInteractive', '-Command',
+     '$input | Set-Clipboard'],
+    ['xclip', '-selection', 'clipboard'],  # Linux
+    ['pbcopy'],                            # macOS
+]
+
+# Commands found on PATH — probed once, on first copy
+_clipboard_cmds = None
+
+
+def _detect_clipboard():
+    """Return the clipboard commands available on this system."""
+    return [cmd for cmd in _CLIPBOARD_COMMANDS if shutil.which(cmd[0])]
+
 
 def copy_to_clipboard(text):
     """Copy text to system clipboard. Returns True on success, False otherwise."""
+    global _clipboard_cmds
     if _clipboard_fn is not None:
         return _clipboard_fn(text)
 
-    # WSL: clip.exe can't handle Unicode; use PowerShell Set-Clipboard
-    if shutil.which('powershell.exe'):
+    if _clipboard_cmds is None:
+        _clipboard_cmds = _detect_clipboard()
+
+    data = text.encode('utf-8')
+    for cmd in _clipboard_cmds:
         try:
-            subprocess.run(
-                ['powershell.exe', '-NoProfile', '-NonInteractive', '-Command',
-                 '$input | Set-Clipboard'],
-                input=text.encode('utf-8'), check=True,
-            )
+            subprocess.run(cmd, input=data, check=True)
             return True
         except (subprocess.CalledProcessError, OSError):
-            pass
-
-    commands = [
-        ['xclip', '-selection', 'clipboard'],  # Linux
-        ['pbcopy'],                            # macOS
-    ]
-    for cmd in commands:
-        if shutil.which(cmd[0]):
-            try:
-                subprocess.run(cmd, input=text.encode('utf-8'), check=True)
-                return True
-            except (subprocess.CalledProcessError, OSError):
-                continue
+            continue
     return False
 
 
@@ -513,10 +688,14 @@ def copy_to_clipboard(text):
 # Math expression evaluator (for QTY editing)
 # ============================================================
 
+_QTY_RE = re.compile(r'^(\d+)\s*[x\u00d7*]\s*(\d+)$')
+
+
+@lru_cache(maxsize=256)
 def eval_qty(text):
     """Evaluate a quantity expression: plain number, or NxN / N*N."""
     text = text.strip()
-    m = re.match(r'^(\d+)\s*[x\u00d7*]\s*(\d+)$', text)
+    m = _QTY_RE.match(text)
     if m:
         return int(m.group(1)) * int(m.group(2))
     try:
@@ -530,11 +709,17 @@ def eval_qty(text):
 # Date parsing (for DATE editing)
 # ============================================================
 
+_DATE_DOT_RE = re.compile(r'(\d{1,2})\.(\d{1,2})\.(\d{2,4})$')
+_DATE_SLASH_RE = re.compile(r'(\d{1,2})/(\d{1,2})/(\d{2,4})$')
+
+
+@lru_cache(maxsize=256)
 def parse_date(text):
     """Parse a date string. Supports DD.MM.YY, DD.MM.YYYY, MM/DD/YY."""
     text = text.strip()
 
-    m = re.match(r'(\d{1,2})\.(\d{1,2})\.(\d{2,4})$', text)
+    # Each regex needs its separator; skip the ones that can't match
+    m = _DATE_DOT_RE.match(text) if '.' in text else None
     if m:
         day, month, year = int(m.group(1)), int(m.group(2)), int(m.group(3))
         if year < 100:
@@ -544,7 +729,7 @@ def parse_date(text):
         except ValueError:
             pass
 
-    m = re.match(r'(\d{1,2})/(\d{1,2})/(\d{2,4})$', text)
+    m = _DATE_SLASH_RE.match(text) if '/' in text else None
     if m:
         month, day, year = int(m.group(1)), int(m.group(2)), int(m.group(3))
         if year < 100:
@@ -555,10 +740,8 @@ def parse_date(text):
             pass
 
     # DDMMYY (6 digits, no separators)
-    m = re.match(r'(\d{6})$', text)
-    if m:
-        s = m.group(1)
-        day, month, year = int(s[:2]), int(s[2:4]), int(s[4:6]) + 2000
+    if len(text) == 6 and text.isdecimal():
+        day, month, year = int(text[:2]), int(text[2:4]), int(text[4:6]) + 2000
         try:
             return date(year, month, day)
         except ValueError:
@@ -577,11 +760,49 @@ def parse_date(text):
 # Double-entry partner detection
 # ============================================================
 
-def find_partner(rows, idx):
+# Fields copied verbatim to the double-entry partner on edit
+MIRROR_FIELDS = frozenset({'inv_type', 'date', 'trans_type', 'batch'})
+
+
+# Fields that make up a row's partner_key; edits to them need a reindex
+PARTNER_KEY_FIELDS = frozenset({'batch', 'inv_type', 'qty'})
+
+
+def partner_key(row):
+    """Index key for find_partner: (batch, inv_type, sign of qty)."""
+    qty = row.get('qty')
+    sign = 0 if not qty else (1 if qty > 0 else -1)
+    return (row.get('batch'), row.get('inv_type'), sign)
+
+
+def build_partner_index(rows):
+    """Index row positions by partner_key for find_partner.
+
+    Each key maps to its row indices in ascending order.
+    """
+    index = {}
+    for i, row in enumerate(rows):
+        index.setdefault(partner_key(row), []).append(i)
+    return index
+
+
+def reindex_partner_row(index, rows, idx, old_key):
+    """Move row idx from old_key to its current key after an edit."""
+    new_key = partner_key(rows[idx])
+    if new_key == old_key:
+        return
+    index[old_key].remove(idx)
+    if not index[old_key]:
+        del index[old_key]
+    bisect.insort(index.setdefault(new_key, []), idx)
+
+
+def find_partner(rows, idx, index=None):
     """Find the double-entry partner of row at idx.
 
     Partner = same batch, same inv_type, opposite sign qty.
-    Returns partner index or None.
+    Returns partner index or None. Pass an index from
+    build_partner_index to probe it instead of scanning rows.
     """
     row = rows[idx]
     batch = row.get('batch')
@@ -590,13 +811,16 @@ def find_partner(rows, idx):
     if batch is None or item is None or qty is None or qty == 0:
         return None
 
+    if index is not None:
+        matches = index.get((batch, item, -1 if qty > 0 else 1))
+        return matches[0] if matches else None
+
     for i, other in enumerate(rows):
-        if i == idx:
+        get = other.get
+        if get('batch') != batch or get('inv_type') != item or i == idx:
             continue
-        if (other.get('batch') == batch
-                and other.get('inv_type') == item
-                and other.get('qty') is not None
-                and other['qty'] * qty < 0):
+        other_qty = get('qty')
+        if other_qty is not None and other_qty * qty < 0:
             return i
     return None
 
@@ -608,7 +832,7 @@ def update_partner(rows, idx, field, new_value):
         return
 
     partner = rows[partner_idx]
-    if field in ('inv_type', 'date', 'trans_type', 'batch'):
+    if field in MIRROR_FIELDS:
         partner[field] = new_value
     elif field == 'qty':
         if isinstance(new_value, (int, float)):
@@ -621,8 +845,8 @@ def update_partner(rows, idx, field, new_value):
 
 def check_alias_opportunity(rows, original_tokens, config):
     """Check if any edited items should be saved as aliases."""
-    aliases = config.get('aliases', {})
-    items = [i.lower() for i in config.get('items', [])]
+    aliases_lower = {a.lower() for a in config.get('aliases', {})}
+    items_lower = {i.lower() for i in config.get('items', [])}
     prompts = []
 
     for idx, original in original_tokens.items():
@@ -639,9 +863,9 @@ def check_alias_opportunity(rows, original_tokens, config):
 
         if orig_lower == canon_lower:
             continue
-        if orig_lower in (a.lower() for a in aliases):
+        if orig_lower in aliases_lower:
             continue
-        if orig_lower in items:
+        if orig_lower in items_lower:
             continue
 
         prompts.append((original, canonical))
@@ -683,6 +907,18 @@ def check_conversion_opportunity(rows, config):
 # Utilities
 # ============================================================
 
+# Parser metadata carried on rows for review, dropped on confirm
+_ROW_METADATA_KEYS = ('_container', '_raw_qty')
+
+
+def strip_row_metadata(rows):
+    """Remove parser metadata keys from rows in place."""
+    for row in rows:
+        for key in _ROW_METADATA_KEYS:
+            if key in row:
+                del row[key]
+
+
 def empty_row():
     return {
         'date': date.today(),
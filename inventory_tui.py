@@ -4,25 +4,26 @@ Interactive review/edit workflow:
   paste message → parse → review table → edit if needed → confirm → done
 """
 
-import re
 import sys
 from datetime import date
 
 from inventory_parser import parse
 from inventory_core import (
-    UIStrings, load_config, save_config,
+    UIStrings, load_config, save_config, config_fingerprint,
     load_config_with_sheets,
     save_learned_alias, save_learned_conversion,
     get_closed_set_fields, get_field_order, get_required_fields,
-    get_closed_set_options,
-    _row_to_cells,
+    get_closed_set_options, incomplete_rows,
+    get_entity_targets, get_container_targets,
+    _rows_to_cells,
     format_rows_for_clipboard,
     copy_to_clipboard,
     eval_qty, parse_date,
-    find_partner, update_partner,
+    find_partner, update_partner, MIRROR_FIELDS,
+    PARTNER_KEY_FIELDS, partner_key, build_partner_index, reindex_partner_row,
     check_alias_opportunity,
     check_conversion_opportunity,
-    empty_row,
+    empty_row, strip_row_metadata,
 )
 
 
@@ -31,19 +32,26 @@ from inventory_core import (
 # ============================================================
 
 def get_input(ui):
-    """Read multi-line paste. Empty line or Ctrl-D to finish."""
+    """Read multi-line paste. Empty line or Ctrl-D to finish.
+
+    Reads line by line even when stdin is piped: the review commands for
+    this message follow the paste on the same stream, so the paste must
+    stop at the first blank line rather than consume the whole input.
+    """
     print(ui.s('paste_prompt'))
     exit_word = ui.s('exit_word').lower()
     lines = []
     try:
         while True:
             line = input()
-            if line.strip().lower() == exit_word:
+            stripped = line.strip()
+            if not stripped:
+                if lines:
+                    break
+                continue
+            if stripped.lower() == exit_word:
                 return None
-            if line.strip() == '' and lines:
-                break
-            if line.strip() != '':
-                lines.append(line)
+            lines.append(line)
     except EOFError:
         pass
     return '\n'.join(lines) if lines else None
@@ -63,36 +71,34 @@ def display_result(rows, notes=None, unparseable=None, ui=None, config=None):
         return
 
     headers = ui.table_headers
+    out = []
 
     if rows:
-        table = [headers]
-        for i, row in enumerate(rows):
-            table.append(_row_to_cells(i, row, config))
+        table = [headers, *_rows_to_cells(rows, config)]
 
-        widths = [max(len(r[c]) for r in table) for c in range(len(headers))]
+        widths = [max(map(len, col)) for col in zip(*table)]
 
         header_line = ' | '.join(h.ljust(w) for h, w in zip(headers, widths))
-        print(f"\n{header_line}")
-        print('-' * len(header_line))
-
-        for row_cells in table[1:]:
-            line = ' | '.join(c.ljust(w) for c, w in zip(row_cells, widths))
-            print(line)
+        out.append(f"\n{header_line}")
+        out.append('-' * len(header_line))
+        out.extend(' | '.join(c.ljust(w) for c, w in zip(row_cells, widths))
+                   for row_cells in table[1:])
 
     if notes:
-        print()
+        out.append('')
         note_prefix = ui.s('note_prefix')
-        for note in notes:
-            print(f'\U0001f4dd {note_prefix}: "{note}"')
+        out.extend(f'\U0001f4dd {note_prefix}: "{note}"' for note in notes)
 
     if unparseable:
-        print()
+        out.append('')
         unparse_prefix = ui.s('unparseable_prefix')
-        for text in unparseable:
-            print(f'\u26a0 {unparse_prefix}: "{text}"')
+        out.extend(f'\u26a0 {unparse_prefix}: "{text}"' for text in unparseable)
         if ui.items:
             items_hint = ', '.join(ui.items)
-            print(f'  {ui.s("help_items_header")} {items_hint}')
+            out.append(f'  {ui.s("help_items_header")} {items_hint}')
+
+    # One write for the whole block rather than a print per line
+    print('\n'.join(out))
 
 
 # ============================================================
@@ -103,12 +109,21 @@ def edit_closed_set(field, options, ui):
     """Show lettered options, return selected value."""
     display_name = ui.field_name(field)
     opt_letters = ui.option_letters
-    print(f"\n{display_name}:")
+    menu = [f"\n{display_name}:"]
     for i, opt in enumerate(options):
         letter = opt_letters[i] if i < len(opt_letters) else str(i)
-        print(f"  [{letter}] {opt}")
-    print()
-
+        menu.append(f"  [{letter}] {opt}")
+    menu.append('')
+    print('\n'.join(menu))
+    # Typed-prefix lookup: first lowercase char → [(lowercase option, option)].
+    # Options may be non-strings (e.g. numeric location codes).
+    by_initial = {}
+    for opt in options:
+        opt_lower = str(opt).lower()
+        if opt_lower:
+            by_initial.setdefault(opt_lower[0], []).append((opt_lower, opt))
+
+    # Menu is shown once; invalid choices only reprint the prompt/error
     while True:
         print(ui.s('enter_letter_prompt'), end='')
         choice = input().strip()
@@ -127,8 +142,8 @@ def edit_closed_set(field, options, ui):
             return options[idx]
 
         # Try typing the value directly
-        for opt in options:
-            if opt.lower().startswith(choice_lower):
+        for opt_lower, opt in by_initial.get(choice_lower[0], ()):
+            if opt_lower.startswith(choice_lower):
                 return opt
 
         first = opt_letters[0] if opt_letters else '?'
@@ -240,7 +255,7 @@ def add_alias_interactive(config, config_path, sheets_client, ui):
         return False
 
     # Fuzzy resolve against all known entities
-    all_entities = items + locations
+    all_entities = get_entity_targets(config)
     resolved, match_type = fuzzy_resolve(target_text, all_entities,
                                           config.get('aliases', {}))
     if resolved and match_type == 'fuzzy':
@@ -263,7 +278,7 @@ def add_alias_interactive(config, config_path, sheets_client, ui):
 
 def add_conversion_interactive(config, config_path, sheets_client, ui):
     """Interactively add a unit conversion with fuzzy matching."""
-    from inventory_parser import fuzzy_resolve, get_all_containers
+    from inventory_parser import fuzzy_resolve
 
     items = config.get('items', [])
     if items:
@@ -293,7 +308,7 @@ def add_conversion_interactive(config, config_path, sheets_client, ui):
     cont_text = input().strip()
     if not cont_text:
         return False
-    containers = list(get_all_containers(config))
+    containers = get_container_targets(config)
     if containers:
         resolved_c, match_c = fuzzy_resolve(cont_text, containers)
         if resolved_c and match_c == 'fuzzy':
@@ -331,6 +346,18 @@ def add_conversion_interactive(config, config_path, sheets_client, ui):
 # Review loop
 # ============================================================
 
+# Returned by review-loop command handlers to keep the loop going
+_CONTINUE = object()
+
+
+def _command_table(bindings):
+    """Map command strings to handlers; the first binding for a string wins."""
+    table = {}
+    for cmd, handler in bindings:
+        table.setdefault(cmd, handler)
+    return table
+
+
 def review_loop(result, raw_text, config, config_path=None, sheets_client=None):
     """Interactive review. Returns confirmed rows or None (quit)."""
     ui = UIStrings(config)
@@ -339,6 +366,7 @@ def review_loop(result, raw_text, config, config_path=None, sheets_client=None):
     unparseable = list(result.unparseable)
 
     original_tokens = {}
+    partner_index = build_partner_index(rows)
 
     cmd_confirm = ui.commands['confirm']
     cmd_quit = ui.commands['quit']
@@ -349,103 +377,126 @@ def review_loop(result, raw_text, config, config_path=None, sheets_client=None):
     cmd_add = ui.commands['add_row']
     cmd_help = ui.commands['help']
 
-    # Build regex patterns from configured codes
-    delete_pattern = re.compile(rf'^{ui._delete_prefix}(\d+)$')
-    field_pattern = re.compile(rf'^(\d+)([{ui._field_code_chars}])$')
+    # Command handlers — return _CONTINUE, or the review outcome
 
-    while True:
-        display_result(rows, notes, unparseable, ui, config)
+    def unknown_command():
+        print(ui.unknown_command_text)
+        return _CONTINUE
 
-        if not rows:
-            if notes:
-                print(ui.s('no_transactions'))
-                print(ui.s('notes_only_prompt'))
-            elif unparseable:
-                print(ui.s('unparseable_prompt'))
-            else:
-                print(ui.s('unparseable_prompt'))
+    def show_help():
+        print(ui.help_text)
+        return _CONTINUE
 
-            cmd = input("> ").strip().lower()
+    def show_empty_help():
+        print(ui.help_text_notes if notes else ui.help_text_unparseable)
+        return _CONTINUE
 
-            if cmd == cmd_help:
-                print(ui.help_text_notes if notes else ui.help_text_unparseable)
-                continue
-            if cmd == cmd_save_note and notes:
-                return {'rows': [], 'notes': notes}
-            if cmd in (cmd_skip, cmd_quit, cmd_confirm):
-                return None
-            if cmd in (cmd_edit, cmd_retry):
-                rows, notes, unparseable = _edit_retry(raw_text, config, ui)
-                continue
-            if cmd == cmd_add:
-                rows.append(empty_row())
-                continue
-            # Unknown command
-            item_code = ui._first_field_code_for('inv_type')
-            item_name = ui.field_name('inv_type').lower()
-            print(ui.s('unknown_command', example_field=item_code, example_name=item_name))
-            continue
+    def save_note():
+        if not notes:
+            return unknown_command()
+        return {'rows': [], 'notes': notes}
 
-        # Normal review
-        print(ui.s('review_prompt'))
-        cmd = input("> ").strip().lower()
+    def discard():
+        return None
 
-        if cmd == cmd_help:
-            print(ui.help_text)
-            continue
+    def retry():
+        nonlocal rows, notes, unparseable, partner_index
+        rows, notes, unparseable = _edit_retry(raw_text, config, ui)
+        partner_index = build_partner_index(rows)
+        return _CONTINUE
+
+    def add_row():
+        rows.append(empty_row())
+        partner_index.setdefault(partner_key(rows[-1]), []).append(len(rows) - 1)
+        return _CONTINUE
+
+    def confirm():
+        # Warn about incomplete rows
+        incomplete = incomplete_rows(rows, config)
+        if incomplete:
+            row_list = ', '.join(str(n) for n in incomplete)
+            print(ui.s('confirm_incomplete_warning',
+                       row_list=row_list,
+                       yes=ui.commands['yes'],
+                       no=ui.commands['no']), end='')
+            resp = input().strip().lower()
+            if resp != ui.commands['yes']:
+                return _CONTINUE
+
+        if original_tokens:
+            prompts = check_alias_opportunity(rows, original_tokens, config)
+            if prompts:
+                prompt_save_aliases(prompts, config, config_path,
+                                   sheets_client, ui)
+
+        conv_prompts = check_conversion_opportunity(rows, config)
+        if conv_prompts:
+            prompt_save_conversions(conv_prompts, config, config_path,
+                                   sheets_client, ui)
+
+        # Strip metadata fields before returning
+        strip_row_metadata(rows)
+
+        return {'rows': rows, 'notes': notes}
+
+    # Listed in priority order, in case a language maps two commands
+    # to the same string
+    empty_commands = _command_table([
+        (cmd_help, show_empty_help),
+        (cmd_save_note, save_note),
+        (cmd_skip, discard),
+        (cmd_quit, discard),
+        (cmd_confirm, discard),
+        (cmd_edit, retry),
+        (cmd_retry, retry),
+        (cmd_add, add_row),
+    ])
+    review_commands = _command_table([
+        (cmd_help, show_help),
+        (cmd_confirm, confirm),
+        (cmd_quit, discard),
+        (cmd_retry, retry),
+        (cmd_add, add_row),
+    ])
+
+    closed_fields = get_closed_set_fields(config)
+
+    # Fixed prompts, shown on every pass through the loop
+    review_prompt = ui.s('review_prompt')
+    notes_only_prompt = ui.s('no_transactions') + '\n' + ui.s('notes_only_prompt')
+    unparseable_prompt = ui.s('unparseable_prompt')
 
-        if cmd == cmd_confirm:
-            # Warn about incomplete rows
-            required = get_required_fields(config)
-            incomplete = [i + 1 for i, r in enumerate(rows)
-                          if r.get('inv_type') == '???'
-                          or any(r.get(f) is None for f in required)]
-            if incomplete:
-                row_list = ', '.join(str(n) for n in incomplete)
-                print(ui.s('confirm_incomplete_warning',
-                           row_list=row_list,
-                           yes=ui.commands['yes'],
-                           no=ui.commands['no']), end='')
-                resp = input().strip().lower()
-                if resp != ui.commands['yes']:
-                    continue
-
-            if original_tokens:
-                prompts = check_alias_opportunity(rows, original_tokens, config)
-                if prompts:
-                    prompt_save_aliases(prompts, config, config_path,
-                                       sheets_client, ui)
-
-            conv_prompts = check_conversion_opportunity(rows, config)
-            if conv_prompts:
-                prompt_save_conversions(conv_prompts, config, config_path,
-                                       sheets_client, ui)
-
-            # Strip metadata fields before returning
-            for row in rows:
-                row.pop('_container', None)
-                row.pop('_raw_qty', None)
-
-            return {'rows': rows, 'notes': notes}
-
-        if cmd == cmd_quit:
-            return None
+    while True:
+        display_result(rows, notes, unparseable, ui, config)
 
-        if cmd == cmd_retry:
-            rows, notes, unparseable = _edit_retry(raw_text, config, ui)
+        if rows:
+            print(review_prompt)
+            commands = review_commands
+        else:
+            print(notes_only_prompt if notes else unparseable_prompt)
+            commands = empty_commands
+
+        cmd = input("> ").strip().lower()
+
+        handler = commands.get(cmd)
+        if handler is not None:
+            outcome = handler()
+            if outcome is not _CONTINUE:
+                return outcome
             continue
 
-        if cmd == cmd_add:
-            rows.append(empty_row())
+        if not rows:
+            unknown_command()
             continue
 
-        # Delete row
-        m = delete_pattern.match(cmd)
-        if m:
-            idx = int(m.group(1)) - 1
+        # Delete row: <delete_prefix><row>
+        num = ui.match_delete(cmd)
+        if num is not None:
+            idx = num - 1
             if 0 <= idx < len(rows):
-                partner_idx = find_partner(rows, idx)
+                partner_idx = find_partner(rows, idx, partner_index)
                 rows.pop(idx)
+                partner_index = build_partner_index(rows)
                 print(ui.s('row_deleted', num=idx + 1))
                 if partner_idx is not None:
                     adjusted = partner_idx if partner_idx < idx else partner_idx - 1
@@ -455,11 +506,10 @@ def review_loop(result, raw_text, config, config_path=None, sheets_client=None):
             continue
 
         # Edit field: <row><field_code>
-        m = field_pattern.match(cmd)
-        if m:
-            row_num = int(m.group(1)) - 1
-            field_code = m.group(2)
-            field = ui._field_code_to_field[field_code]
+        edit = ui.match_field_edit(cmd)
+        if edit:
+            row_num, field = edit
+            row_num -= 1
 
             if row_num < 0 or row_num >= len(rows):
                 print(ui.s('invalid_row'))
@@ -468,69 +518,70 @@ def review_loop(result, raw_text, config, config_path=None, sheets_client=None):
             old_value = rows[row_num].get(field)
             old_item_token = rows[row_num].get('inv_type') if field == 'inv_type' else None
 
-            if field in get_closed_set_fields(config):
+            if field in closed_fields:
                 options = get_closed_set_options(field, config)
                 new_value = edit_closed_set(field, options, ui)
             else:
                 new_value = edit_open_field(field, old_value, ui)
 
             if new_value is not None:
-                partner_idx = find_partner(rows, row_num)
+                partner_idx = find_partner(rows, row_num, partner_index)
+                affected = [row_num] if partner_idx is None else [row_num, partner_idx]
+                old_keys = [partner_key(rows[i]) for i in affected]
                 rows[row_num][field] = new_value
                 if partner_idx is not None:
-                    if field in ('inv_type', 'date', 'trans_type', 'batch'):
+                    if field in MIRROR_FIELDS:
                         rows[partner_idx][field] = new_value
                     elif field == 'qty' and isinstance(new_value, (int, float)):
                         rows[partner_idx]['qty'] = -new_value
+                if field in PARTNER_KEY_FIELDS:
+                    for i, old_key in zip(affected, old_keys):
+                        reindex_partner_row(partner_index, rows, i, old_key)
 
                 if field == 'inv_type' and old_item_token and old_item_token != new_value:
                     original_tokens[row_num] = old_item_token
 
                 print(ui.s('row_updated',
                            num=row_num + 1,
-                           field=ui.field_name(field).lower(),
+                           field=ui.field_name_lower(field),
                            value=new_value))
             continue
 
-        # Unknown command
-        item_code = ui._first_field_code_for('inv_type')
-        item_name = ui.field_name('inv_type').lower()
-        print(ui.s('unknown_command', example_field=item_code, example_name=item_name))
-
-    return None
+        unknown_command()
 
 
 def _edit_retry(raw_text, config, ui):
     """Show numbered lines, let user edit by line number, re-parse."""
     lines = [l for l in raw_text.split('\n') if l.strip()]
+    line_prompt = ui.s('edit_line_prompt')
+    new_prompt = ui.s('edit_line_new')
+    invalid_row = ui.s('invalid_row')
 
     while True:
-        print()
-        for i, line in enumerate(lines, 1):
-            print(f'  {i}. {line}')
-        print()
-        print(ui.s('edit_line_prompt'), end=' ')
+        listing = ['', *(f'  {i}. {line}' for i, line in enumerate(lines, 1)), '']
+        print('\n'.join(listing))
+        print(line_prompt, end=' ')
         choice = input().strip()
         if not choice:
             break
         try:
             num = int(choice)
         except ValueError:
-            print(ui.s('invalid_row'))
+            print(invalid_row)
             continue
         if num < 1 or num > len(lines) + 1:
-            print(ui.s('invalid_row'))
+            print(invalid_row)
             continue
         if num == len(lines) + 1:
             # Add a new line
-            print(ui.s('edit_line_new'), end=' ')
+            print(new_prompt, end=' ')
             new = input().strip()
             if new:
                 lines.append(new)
                 print(ui.s('edit_line_updated', num=num))
             continue
         print(f'  {lines[num - 1]}')
-        print(ui.s('edit_line_new'), end=' ')
+        print(new_prompt, end=' ')
         new = input().strip()
         if new:
             lines[num - 1] = new
@@ -548,6 +599,11 @@ def _edit_retry(raw_text, config, ui):
 # Main
 # ============================================================
 
+def _direct_commands(ui):
+    """Lowercased alias/convert commands recognised at the paste prompt."""
+    return ui.s('cmd_alias').lower(), ui.s('cmd_convert').lower()
+
+
 def main(config_path='config_he.yaml'):
     try:
         config, sheets_client = load_config_with_sheets(config_path)
@@ -557,6 +613,8 @@ def main(config_path='config_he.yaml'):
         sys.exit(1)
 
     ui = UIStrings(config)
+    cmd_alias, cmd_convert = _direct_commands(ui)
+    saved_fingerprint = config_fingerprint(config)
 
     print(ui.s('title'))
     print(ui.s('subtitle'))
@@ -569,11 +627,12 @@ def main(config_path='config_he.yaml'):
 
         # Direct commands
         cmd = raw_text.strip().lower()
-        if cmd == ui.s('cmd_alias').lower():
+        if cmd == cmd_alias:
             add_alias_interactive(config, config_path, sheets_client, ui)
             ui = UIStrings(config)
+            cmd_alias, cmd_convert = _direct_commands(ui)
             continue
-        if cmd == ui.s('cmd_convert').lower():
+        if cmd == cmd_convert:
             add_conversion_interactive(config, config_path, sheets_client, ui)
             continue
 
@@ -617,7 +676,11 @@ def main(config_path='config_he.yaml'):
             for note in confirmed_notes:
                 print(f'\U0001f4dd {saved_prefix}: "{note}"')
 
-        save_config(config, config_path)
+        # Only rewrite the YAML if this cycle changed the config
+        fingerprint = config_fingerprint(config)
+        if fingerprint != saved_fingerprint:
+            save_config(config, config_path)
+            saved_fingerprint = fingerprint
 
 
 if __name__ == '__main__':
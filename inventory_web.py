@@ -4,6 +4,7 @@ Side-by-side SPA: left pane for message editing, right pane for parsed results.
 Run with: python inventory_web.py
 """
 
+import hashlib
 import http.server
 import json
 import os
@@ -15,17 +16,25 @@ from datetime import date
 
 from inventory_parser import parse, fuzzy_resolve
 from inventory_core import (
-    UIStrings, load_config, save_config,
+    UIStrings, load_config, save_config, config_fingerprint,
     load_config_with_sheets,
     save_learned_alias, save_learned_conversion,
     format_rows_for_clipboard, find_partner,
     check_alias_opportunity, check_conversion_opportunity,
-    empty_row, eval_qty, parse_date,
+    empty_row, strip_row_metadata, eval_qty, parse_date,
     get_closed_set_fields, get_field_order, get_required_fields,
     get_closed_set_options, row_has_warning,
+    get_entity_targets, get_container_targets,
+    MIRROR_FIELDS, config_memo,
 )
 
+# config, config_path and sheets_client are set once in main() before the
+# server starts, so handlers read them without locking. The lock guards the
+# review state (rows, notes, unparseable, original_tokens).
 _state_lock = threading.Lock()
+# Serializes every config change and write (confirm, learned aliases and
+# conversions) so concurrent requests can't interleave edits to the YAML.
+_save_lock = threading.Lock()
 _state = {
     'config': None,
     'config_path': None,
@@ -34,6 +43,7 @@ _state = {
     'notes': [],
     'unparseable': [],
     'original_tokens': {},
+    'saved_fingerprint': None,
 }
 
 
@@ -44,6 +54,10 @@ def _json_serial(obj):
     raise TypeError(f"Type {type(obj)} not serializable")
 
 
+# Shared encoder — json.dumps builds a new one per call when given options
+_encode_json = json.JSONEncoder(ensure_ascii=False, default=_json_serial).encode
+
+
 # ============================================================
 # HTML SPA — loaded from index.html
 # ============================================================
@@ -51,6 +65,7 @@ def _json_serial(obj):
 _HTML_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'index.html')
 with open(_HTML_PATH, 'r', encoding='utf-8') as _f:
     _HTML = _f.read()
+_HTML_BYTES = _HTML.encode()
 
 
 # ============================================================
@@ -60,7 +75,7 @@ with open(_HTML_PATH, 'r', encoding='utf-8') as _f:
 class _H(http.server.BaseHTTPRequestHandler):
     def do_GET(self):
         if self.path == '/':
-            self._ok('text/html', _HTML.encode())
+            self._ok('text/html', _HTML_BYTES)
         elif self.path == '/api/config':
             self._handle_config()
         else:
@@ -72,69 +87,35 @@ class _H(http.server.BaseHTTPRequestHandler):
         if cl > 0:
             body = json.loads(self.rfile.read(cl))
 
-        handlers = {
-            '/api/parse': self._handle_parse,
-            '/api/confirm': self._handle_confirm,
-            '/api/edit': self._handle_edit,
-            '/api/delete': self._handle_delete,
-            '/api/alias': self._handle_alias,
-            '/api/conversion': self._handle_conversion,
-            '/api/fuzzy': self._handle_fuzzy,
-        }
-        handler = handlers.get(self.path)
+        handler = self._post_routes.get(self.path)
         if handler:
-            handler(body)
+            handler(self, body)
         else:
             self.send_error(404)
 
     def _handle_config(self):
-        with _state_lock:
-            config = _state['config']
-        ui = UIStrings(config)
-
-        # Pre-resolve closed-set options so JS doesn't re-derive them
-        closed_set_options = {}
-        for field in get_closed_set_fields(config):
-            closed_set_options[field] = get_closed_set_options(field, config)
-
-        payload = {
-            'items': config.get('items', []),
-            'locations': config.get('locations', []),
-            'default_source': config.get('default_source', ''),
-            'transaction_types': config.get('transaction_types', []),
-            'aliases': config.get('aliases', {}),
-            'unit_conversions': config.get('unit_conversions', {}),
-            'closed_set_options': closed_set_options,
-            'required_fields': get_required_fields(config),
-            'field_order': get_field_order(config),
-            'ui': {
-                'commands': ui.commands,
-                'field_codes': ui.field_codes,
-                'field_display_names': ui.field_display_names,
-                'table_headers': ui.table_headers,
-                'option_letters': ui.option_letters,
-                'strings': ui.strings,
-                'field_order': get_field_order(config),
-            },
-        }
-        self._json(payload)
+        config = _state['config']
+        # Encoded once per config version; learning and saves drop the cache
+        etag, body = config_memo(
+            config, 'api_config', lambda: _encode_config(config))
+        # The SPA refetches after every confirm; unchanged configs get a 304
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        self._ok('application/json', body, etag=etag)
 
     def _handle_parse(self, body):
         text = body.get('text', '')
-        with _state_lock:
-            config = _state['config']
+        config = _state['config']
         result = parse(text, config)
-        rows = []
-        for row in result.rows:
-            r = dict(row)
-            # Ensure date is serializable
-            if 'date' in r and isinstance(r['date'], date):
-                r['date'] = r['date'].isoformat()
-            rows.append(r)
+        # Rows keep their date objects; the encoder writes them as ISO strings
+        rows = list(result.rows)
         notes = list(result.notes)
         unparseable = list(result.unparseable)
         with _state_lock:
-            _state['rows'] = list(result.rows)  # keep original (with date objects)
+            _state['rows'] = rows
             _state['notes'] = notes
             _state['unparseable'] = unparseable
         self._json({'rows': rows, 'notes': notes, 'unparseable': unparseable})
@@ -142,9 +123,8 @@ class _H(http.server.BaseHTTPRequestHandler):
     def _handle_confirm(self, body):
         target = body.get('target', 'both')  # 'sheet', 'clipboard', 'both'
 
-        with _state_lock:
-            config = _state['config']
-            sheets_client = _state['sheets_client']
+        config = _state['config']
+        sheets_client = _state['sheets_client']
 
         # Use rows from JS (may have updated qty from pre-confirm conversions)
         if body.get('rows'):
@@ -157,9 +137,7 @@ class _H(http.server.BaseHTTPRequestHandler):
         alias_prompts = check_alias_opportunity(rows, _state.get('original_tokens', {}), config)
 
         # Strip metadata
-        for row in rows:
-            row.pop('_container', None)
-            row.pop('_raw_qty', None)
+        strip_row_metadata(rows)
 
         # Generate TSV for clipboard targets
         tsv = None
@@ -187,7 +165,14 @@ class _H(http.server.BaseHTTPRequestHandler):
             _state['notes'] = []
             _state['unparseable'] = []
             _state['original_tokens'] = {}
-            save_config(config, _state['config_path'])
+
+        # Only rewrite the YAML if the config changed since the last save.
+        # Done outside the state lock: the review state isn't involved.
+        with _save_lock:
+            fingerprint = config_fingerprint(config)
+            if fingerprint != _state['saved_fingerprint']:
+                save_config(config, _state['config_path'])
+                _state['saved_fingerprint'] = fingerprint
 
         self._json({
             'ok': True,
@@ -204,42 +189,35 @@ class _H(http.server.BaseHTTPRequestHandler):
         field = body.get('field', '')
         value = body.get('value', '')
 
-        with _state_lock:
-            config = _state['config']
+        config = _state['config']
 
         # Reconstruct rows with proper types
         rows = _deserialize_rows(rows)
 
         if row_idx < 0 or row_idx >= len(rows):
-            self._json({'error': 'Invalid row', 'rows': _serialize_rows(rows)})
+            self._json({'error': 'Invalid row', 'rows': rows})
             return
 
         # Parse value based on field type
         if field == 'qty':
             parsed = eval_qty(value)
             if parsed is None:
-                self._json({'error': 'Invalid quantity', 'rows': _serialize_rows(rows)})
+                self._json({'error': 'Invalid quantity', 'rows': rows})
                 return
             value = parsed
         elif field == 'date':
-            parsed = parse_date(value) if not isinstance(value, str) or len(value) > 0 else None
             if isinstance(value, str) and value:
+                # parse_date also accepts ISO dates, as the table displays them
                 parsed = parse_date(value)
                 if parsed is None:
-                    # Try ISO format
-                    try:
-                        parsed = date.fromisoformat(value)
-                    except ValueError:
-                        pass
-                if parsed is None:
-                    self._json({'error': 'Invalid date', 'rows': _serialize_rows(rows)})
+                    self._json({'error': 'Invalid date', 'rows': rows})
                     return
                 value = parsed
         elif field == 'batch':
             try:
                 value = int(value)
             except (ValueError, TypeError):
-                self._json({'error': 'Invalid batch', 'rows': _serialize_rows(rows)})
+                self._json({'error': 'Invalid batch', 'rows': rows})
                 return
 
         # Track original token for alias learning
@@ -249,19 +227,17 @@ class _H(http.server.BaseHTTPRequestHandler):
         # Update partner
         partner_idx = find_partner(rows, row_idx)
         if partner_idx is not None:
-            if field in ('inv_type', 'date', 'trans_type', 'batch'):
+            if field in MIRROR_FIELDS:
                 rows[partner_idx][field] = value
             elif field == 'qty' and isinstance(value, (int, float)):
                 rows[partner_idx]['qty'] = -value
 
-        if field == 'inv_type' and old_item and old_item != value:
-            with _state_lock:
-                _state['original_tokens'][row_idx] = old_item
-
         with _state_lock:
+            if field == 'inv_type' and old_item and old_item != value:
+                _state['original_tokens'][row_idx] = old_item
             _state['rows'] = rows
 
-        self._json({'rows': _serialize_rows(rows)})
+        self._json({'rows': rows})
 
     def _handle_delete(self, body):
         rows = _deserialize_rows(body.get('rows', []))
@@ -273,13 +249,13 @@ class _H(http.server.BaseHTTPRequestHandler):
             rows.pop(row_idx)
             if partner_idx is not None:
                 adjusted = partner_idx if partner_idx < row_idx else partner_idx - 1
-                ui = UIStrings(_state['config'])
+                ui = _ui_strings(_state['config'])
                 warning = ui.s('delete_partner_warning', partner_num=adjusted + 1)
 
         with _state_lock:
             _state['rows'] = rows
 
-        self._json({'rows': _serialize_rows(rows), 'warning': warning})
+        self._json({'rows': rows, 'warning': warning})
 
     def _handle_alias(self, body):
         alias = body.get('alias', '').strip()
@@ -288,19 +264,19 @@ class _H(http.server.BaseHTTPRequestHandler):
             self._json({'ok': False})
             return
 
-        with _state_lock:
-            config = _state['config']
-            sheets_client = _state['sheets_client']
+        config = _state['config']
+        sheets_client = _state['sheets_client']
 
         # Fuzzy resolve target
-        items = config.get('items', [])
-        locations = config.get('locations', [])
-        all_entities = items + locations + config.get('transaction_types', [])
+        all_entities = config_memo(
+            config, 'alias_targets',
+            lambda: get_entity_targets(config) + config.get('transaction_types', []))
         resolved, match_type = fuzzy_resolve(target, all_entities, config.get('aliases', {}))
         final_target = resolved if resolved else target
 
-        save_learned_alias(config, _state['config_path'], sheets_client,
-                           alias, final_target)
+        with _save_lock:
+            save_learned_alias(config, _state['config_path'], sheets_client,
+                               alias, final_target)
 
         self._json({'ok': True, 'resolved': final_target, 'match_type': match_type})
 
@@ -312,76 +288,120 @@ class _H(http.server.BaseHTTPRequestHandler):
             self._json({'ok': False})
             return
 
-        with _state_lock:
-            config = _state['config']
-            sheets_client = _state['sheets_client']
+        config = _state['config']
+        sheets_client = _state['sheets_client']
 
         # Fuzzy resolve item and container
         items = config.get('items', [])
         resolved_item, _ = fuzzy_resolve(item, items, config.get('aliases', {}))
         final_item = resolved_item or item
 
-        from inventory_parser import get_all_containers
-        containers = list(get_all_containers(config))
-        resolved_cont, _ = fuzzy_resolve(container, containers)
+        resolved_cont, _ = fuzzy_resolve(container, get_container_targets(config))
         final_container = resolved_cont or container
 
         factor_val = float(factor)
         if factor_val == int(factor_val):
             factor_val = int(factor_val)
 
-        save_learned_conversion(config, _state['config_path'], sheets_client,
-                                final_item, final_container, factor_val)
+        with _save_lock:
+            save_learned_conversion(config, _state['config_path'], sheets_client,
+                                    final_item, final_container, factor_val)
 
         self._json({'ok': True, 'item': final_item, 'container': final_container})
 
     def _handle_fuzzy(self, body):
         text = body.get('text', '')
         ctype = body.get('candidates_type', 'items')
-        with _state_lock:
-            config = _state['config']
+        config = _state['config']
         candidates = config.get(ctype, [])
         resolved, match_type = fuzzy_resolve(text, candidates, config.get('aliases', {}))
         self._json({'resolved': resolved, 'match_type': match_type})
 
-    def _ok(self, ct, body):
+    # Path → handler, built once with the class rather than per request
+    _post_routes = {
+        '/api/parse': _handle_parse,
+        '/api/confirm': _handle_confirm,
+        '/api/edit': _handle_edit,
+        '/api/delete': _handle_delete,
+        '/api/alias': _handle_alias,
+        '/api/conversion': _handle_conversion,
+        '/api/fuzzy': _handle_fuzzy,
+    }
+
+    def _ok(self, ct, body, etag=None):
         self.send_response(200)
         self.send_header('Content-Type', ct + '; charset=utf-8')
         self.send_header('Content-Length', str(len(body)))
+        if etag:
+            # Let the browser cache it, but revalidate on every use
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
         self.end_headers()
         self.wfile.write(body)
 
     def _json(self, data):
-        body = json.dumps(data, ensure_ascii=False, default=_json_serial).encode()
+        body = _encode_json(data).encode()
         self._ok('application/json', body)
 
     def log_message(self, *args):
         pass
 
 
-def _serialize_rows(rows):
-    """Convert rows to JSON-safe format."""
-    out = []
-    for row in rows:
-        r = dict(row)
-        if 'date' in r and isinstance(r['date'], date):
-            r['date'] = r['date'].isoformat()
-        out.append(r)
-    return out
+def _ui_strings(config):
+    """UIStrings for config, built once per config version."""
+    return config_memo(config, 'ui', lambda: UIStrings(config))
+
+
+def _config_payload(config):
+    """Everything the SPA needs from the config, for /api/config."""
+    ui = _ui_strings(config)
+
+    # Pre-resolve closed-set options so JS doesn't re-derive them
+    closed_set_options = {}
+    for field in get_closed_set_fields(config):
+        closed_set_options[field] = get_closed_set_options(field, config)
+
+    return {
+        'items': config.get('items', []),
+        'locations': config.get('locations', []),
+        'default_source': config.get('default_source', ''),
+        'transaction_types': config.get('transaction_types', []),
+        'aliases': config.get('aliases', {}),
+        'unit_conversions': config.get('unit_conversions', {}),
+        'closed_set_options': closed_set_options,
+        'required_fields': get_required_fields(config),
+        'field_order': get_field_order(config),
+        'ui': {
+            'commands': ui.commands,
+            'field_codes': ui.field_codes,
+            'field_display_names': ui.field_display_names,
+            'table_headers': ui.table_headers,
+            'option_letters': ui.option_letters,
+            'strings': ui.strings,
+            'field_order': get_field_order(config),
+        },
+    }
+
+
+def _encode_config(config):
+    """(ETag, encoded /api/config body) for config."""
+    body = _encode_json(_config_payload(config)).encode()
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"', body
 
 
 def _deserialize_rows(rows):
-    """Convert JSON rows back to proper Python types."""
-    out = []
+    """Convert JSON rows back to proper Python types, in place.
+
+    The rows are fresh from the request body, so no copy is needed.
+    """
     for row in rows:
-        r = dict(row)
-        if 'date' in r and isinstance(r['date'], str):
+        d = row.get('date')
+        if isinstance(d, str):
             try:
-                r['date'] = date.fromisoformat(r['date'])
-            except (ValueError, TypeError):
+                row['date'] = date.fromisoformat(d)
+            except ValueError:
                 pass
-        out.append(r)
-    return out
+    return rows
 
 
 def main():
@@ -393,6 +413,7 @@ def main():
         _state['config'] = config
         _state['config_path'] = config_path
         _state['sheets_client'] = sheets_client
+        _state['saved_fingerprint'] = config_fingerprint(config)
 
     class _ThreadedServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
         daemon_threads = True
@@ -5,10 +5,11 @@ Usage:
   python3 make_config.py config_he.yaml   # use existing config as base
 """
 
-import yaml
 import sys
 import os
 
+from inventory_core import load_config, save_config
+
 
 def show_current(label, values):
     """Show the current/base values for a section."""
@@ -105,8 +106,7 @@ def main():
     if len(sys.argv) > 1:
         base_path = sys.argv[1]
         if os.path.exists(base_path):
-            with open(base_path, 'r', encoding='utf-8') as f:
-                base = yaml.safe_load(f) or {}
+            base = load_config(base_path) or {}
             print(f"\n  Loaded base config: {base_path}")
         else:
             print(f"\n  Warning: {base_path} not found, starting from scratch.")
@@ -272,8 +272,7 @@ def main():
     default_path = 'my_config.yaml'
     out_path = read_single("Output file name", default=default_path)
 
-    with open(out_path, 'w', encoding='utf-8') as f:
-        yaml.dump(config, f, default_flow_style=False, allow_unicode=True, sort_keys=False)
+    save_config(config, out_path)
 
     print(f"\n  Saved to {out_path}")
     print(f"  Run with: python3 inventory_tui.py {out_path}\n")
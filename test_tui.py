@@ -13,9 +13,9 @@ from datetime import date
 
 from inventory_parser import parse, ParseResult
 from inventory_core import (
-    eval_qty, parse_date, find_partner, update_partner,
+    eval_qty, parse_date, find_partner, update_partner, build_partner_index,
     check_alias_opportunity, format_rows_for_clipboard,
-    copy_to_clipboard, check_conversion_opportunity, empty_row,
+    copy_to_clipboard, check_conversion_opportunity, empty_row, UIStrings,
 )
 from inventory_tui import (
     review_loop, display_result, prompt_save_conversions,
@@ -111,6 +111,30 @@ class TestParseDate:
         assert parse_date("not-a-date") is None
 
 
+class TestCommandMatching:
+    def test_delete_command(self):
+        ui = UIStrings({})
+        assert ui.match_delete("x3") == 3
+        assert ui.match_delete("x12") == 12
+
+    def test_delete_command_rejects_non_numeric(self):
+        ui = UIStrings({})
+        assert ui.match_delete("x") is None
+        assert ui.match_delete("xa") is None
+        assert ui.match_delete("3x") is None
+
+    def test_field_edit_command(self):
+        ui = UIStrings({})
+        assert ui.match_field_edit("1i") == (1, 'inv_type')
+        assert ui.match_field_edit("12q") == (12, 'qty')
+
+    def test_field_edit_rejects_unknown_code(self):
+        ui = UIStrings({})
+        assert ui.match_field_edit("1z") is None
+        assert ui.match_field_edit("i") is None
+        assert ui.match_field_edit("x1") is None
+
+
 # ============================================================
 # Unit tests: double-entry partner detection
 # ============================================================
@@ -137,6 +161,17 @@ class TestFindPartner:
         ]
         assert find_partner(rows, 0) is None
 
+    def test_index_lookup_matches_scan(self):
+        rows = [
+            {'batch': 1, 'inv_type': 'spaghetti', 'qty': -34},
+            {'batch': 2, 'inv_type': 'spaghetti', 'qty': 34},
+            {'batch': 1, 'inv_type': 'cucumbers', 'qty': 4},
+            {'batch': 1, 'inv_type': 'spaghetti', 'qty': 34},
+        ]
+        index = build_partner_index(rows)
+        for i in range(len(rows)):
+            assert find_partner(rows, i, index) == find_partner(rows, i)
+
 
 class TestUpdatePartner:
     def test_item_update_syncs(self):
@@ -649,6 +684,22 @@ class TestClosedSetOptions:
         from inventory_tui import get_closed_set_options
         assert get_closed_set_options('nonexistent', config) == []
 
+    def test_options_rebuilt_after_invalidate(self, config):
+        """In-place config changes show up once the memo is invalidated."""
+        from inventory_core import get_closed_set_options, invalidate_config_memo
+        assert 'zucchini' not in get_closed_set_options('inv_type', config)
+        config['items'].append('zucchini')
+        invalidate_config_memo(config)
+        assert 'zucchini' in get_closed_set_options('inv_type', config)
+
+    def test_numeric_options_selectable(self, config, monkeypatch):
+        """Non-string options (numeric location codes) work by letter or typed value."""
+        from inventory_tui import edit_closed_set
+        ui = UIStrings(config)
+        monkeypatch.setattr('builtins.input', make_input(['a', '3']))
+        assert edit_closed_set('vehicle_sub_unit', [1, 2, 3], ui) == 1
+        assert edit_closed_set('vehicle_sub_unit', [1, 2, 3], ui) == 3
+
 
 # ============================================================
 # Display edge cases
@@ -889,6 +940,14 @@ class TestDoubleEntryPartnerIntegration:
         assert outcome['rows'][0]['batch'] == 5
         assert outcome['rows'][1]['batch'] == 5
 
+    def test_partner_still_found_after_batch_edit(self, config, monkeypatch):
+        """After re-batching a pair, a qty edit still reaches the partner."""
+        result = parse("4 cucumbers to L", config, today=TODAY)
+        monkeypatch.setattr('builtins.input', make_input(["1b", "5", "2q", "10", "c"]))
+        outcome = review_loop(result, "...", config)
+        assert outcome['rows'][1]['qty'] == 10
+        assert outcome['rows'][0]['qty'] == -10
+
 
 # ============================================================
 # Review loop: confirm with incomplete rows
@@ -1189,6 +1248,11 @@ class TestFormatRowsForClipboard:
 class TestCopyToClipboard:
     """Tests for copy_to_clipboard (system clipboard integration)."""
 
+    @pytest.fixture(autouse=True)
+    def reset_detection(self, monkeypatch):
+        """Clear the cached clipboard probe so each test sees its own PATH."""
+        monkeypatch.setattr('inventory_core._clipboard_cmds', None)
+
     def test_success_returns_true(self, monkeypatch):
         """Successful clipboard copy returns True."""
         monkeypatch.setattr('shutil.which', lambda cmd: '/usr/bin/powershell.exe' if cmd == 'powershell.exe' else None)
@@ -1256,11 +1320,25 @@ class TestCopyToClipboard:
 
         assert copy_to_clipboard("test") is False
 
+    def test_tool_detection_runs_once(self, monkeypatch):
+        """PATH is probed on the first copy only; later copies reuse it."""
+        probes = []
+        def mock_which(cmd):
+            probes.append(cmd)
+            return '/usr/bin/xclip' if cmd == 'xclip' else None
+        monkeypatch.setattr('shutil.which', mock_which)
+        monkeypatch.setattr('subprocess.run', lambda cmd, input, check: None)
+
+        assert copy_to_clipboard("one") is True
+        count = len(probes)
+        assert copy_to_clipboard("two") is True
+        assert len(probes) == count
+
 
 class TestClipboardIntegration:
     """Integration tests: confirm → clipboard, not reprint."""
 
-    def test_confirm_copies_to_clipboard(self, config, monkeypatch, capsys):
+    def test_confirm_copies_to_clipboard(self, config, monkeypatch, tmp_path, capsys):
         """After confirm in main(), rows are copied to clipboard, table not reprinted."""
         from inventory_tui import main
 
@@ -1284,7 +1362,7 @@ class TestClipboardIntegration:
         monkeypatch.setattr('inventory_tui.copy_to_clipboard', mock_copy)
 
         try:
-            main('dummy.yaml')
+            main(str(tmp_path / 'config.yaml'))
         except (EOFError, SystemExit):
             pass
 
@@ -1298,7 +1376,26 @@ class TestClipboardIntegration:
         # Confirmation message shown (not the table)
         assert 'copied to clipboard' in output.lower()
 
-    def test_confirm_does_not_reprint_table(self, config, monkeypatch, capsys):
+    def test_unchanged_config_not_resaved(self, config, monkeypatch, tmp_path):
+        """A confirm that learns nothing doesn't rewrite the config file."""
+        from inventory_tui import main
+
+        saves = []
+        monkeypatch.setattr('inventory_tui.load_config_with_sheets', lambda path: (config, None))
+        monkeypatch.setattr('inventory_tui.save_config', lambda config, path: saves.append(path))
+        monkeypatch.setattr('inventory_tui.copy_to_clipboard', lambda text: True)
+        monkeypatch.setattr('builtins.input', make_input([
+            "eaten by L", "4 cucumbers", "", "c",
+        ]))
+
+        try:
+            main(str(tmp_path / 'config.yaml'))
+        except (EOFError, SystemExit):
+            pass
+
+        assert saves == []
+
+    def test_confirm_does_not_reprint_table(self, config, monkeypatch, tmp_path, capsys):
         """After confirm, the table should NOT be reprinted."""
         from inventory_tui import main
 
@@ -1315,7 +1412,7 @@ class TestClipboardIntegration:
         ]))
 
         try:
-            main('dummy.yaml')
+            main(str(tmp_path / 'config.yaml'))
         except (EOFError, SystemExit):
             pass
 
@@ -1326,7 +1423,7 @@ class TestClipboardIntegration:
         # we should NOT see "Confirmed transactions" or a second table
         assert 'Confirmed transactions' not in output
 
-    def test_clipboard_failure_falls_back_to_table(self, config, monkeypatch, capsys):
+    def test_clipboard_failure_falls_back_to_table(self, config, monkeypatch, tmp_path, capsys):
         """If clipboard fails, fall back to printing the table."""
         from inventory_tui import main
 
@@ -1343,7 +1440,7 @@ class TestClipboardIntegration:
         ]))
 
         try:
-            main('dummy.yaml')
+            main(str(tmp_path / 'config.yaml'))
         except (EOFError, SystemExit):
             pass
 
@@ -1353,7 +1450,7 @@ class TestClipboardIntegration:
         assert 'clipboard' in output.lower()
         assert 'cucumbers' in output
 
-    def test_notes_still_printed_after_clipboard(self, config, monkeypatch, capsys):
+    def test_notes_still_printed_after_clipboard(self, config, monkeypatch, tmp_path, capsys):
         """Notes are still printed to console even when clipboard succeeds."""
         from inventory_tui import main
 
@@ -1370,7 +1467,7 @@ class TestClipboardIntegration:
         ]))
 
         try:
-            main('dummy.yaml')
+            main(str(tmp_path / 'config.yaml'))
         except (EOFError, SystemExit):
             pass
 
@@ -1539,7 +1636,7 @@ class TestDirectAddAlias:
         result = add_alias_interactive(config, None, None, ui)
         assert result is False
 
-    def test_alias_command_in_main(self, config, monkeypatch, capsys):
+    def test_alias_command_in_main(self, config, monkeypatch, tmp_path, capsys):
         """Typing 'alias' at paste prompt triggers interactive add."""
         from inventory_tui import main
 
@@ -1555,7 +1652,7 @@ class TestDirectAddAlias:
         ]))
 
         try:
-            main('dummy.yaml')
+            main(str(tmp_path / 'config.yaml'))
         except (EOFError, SystemExit):
             pass
 
@@ -1587,7 +1684,7 @@ class TestDirectAddConversion:
         result = add_conversion_interactive(config, None, None, ui)
         assert result is False
 
-    def test_convert_command_in_main(self, config, monkeypatch, capsys):
+    def test_convert_command_in_main(self, config, monkeypatch, tmp_path, capsys):
         """Typing 'convert' at paste prompt triggers interactive add."""
         from inventory_tui import main
 
@@ -1604,7 +1701,7 @@ class TestDirectAddConversion:
         ]))
 
         try:
-            main('dummy.yaml')
+            main(str(tmp_path / 'config.yaml'))
         except (EOFError, SystemExit):
             pass
 
@@ -1737,6 +1834,18 @@ class TestFuzzyConversionInteractive:
         assert result is True
         assert config['unit_conversions']['cucumbers']['small box'] == 500
 
+    def test_learned_container_is_fuzzy_target(self, config, monkeypatch):
+        """A container saved in one conversion is matchable in the next."""
+        from inventory_tui import UIStrings
+        ui = UIStrings(config)
+        monkeypatch.setattr('builtins.input', make_input([
+            'cucumbers', 'crate', '500',
+            'carrots', 'crat', 'y', '40',
+        ]))
+        assert add_conversion_interactive(config, None, None, ui) is True
+        assert add_conversion_interactive(config, None, None, ui) is True
+        assert config['unit_conversions']['carrots'] == {'crate': 40}
+
 
 # ============================================================
 # Paste prompt mentions alias/convert
@@ -1823,3 +1932,53 @@ class TestConfigDrivenFields:
         cells = result.split('\t')
         assert cells[0] == 'cucumbers'
         assert cells[1] == '10'
+
+
+# ============================================================
+# Config saving
+# ============================================================
+
+class TestSaveConfig:
+    """save_config swaps in a new file without disturbing the original's setup."""
+
+    def test_writes_through_symlink(self, tmp_path):
+        from inventory_core import save_config, load_config
+        real = tmp_path / 'real.yaml'
+        real.write_text('items: []\n', encoding='utf-8')
+        link = tmp_path / 'config.yaml'
+        link.symlink_to(real)
+
+        save_config({'items': ['cucumbers']}, str(link))
+
+        assert link.is_symlink()
+        assert load_config(str(real)) == {'items': ['cucumbers']}
+        assert sorted(p.name for p in tmp_path.iterdir()) == ['config.yaml', 'real.yaml']
+
+    def test_keeps_file_mode(self, tmp_path):
+        import os
+        from inventory_core import save_config
+        path = tmp_path / 'config.yaml'
+        path.write_text('items: []\n', encoding='utf-8')
+        os.chmod(path, 0o640)
+
+        save_config({'items': ['cucumbers']}, str(path))
+
+        assert path.stat().st_mode & 0o777 == 0o640
+
+    def test_unchanged_config_not_rewritten(self, tmp_path):
+        import os
+        from inventory_core import save_config
+        path = tmp_path / 'config.yaml'
+        save_config({'items': ['cucumbers']}, str(path))
+        os.utime(path, ns=(0, 0))
+
+        save_config({'items': ['cucumbers']}, str(path))
+
+        assert path.stat().st_mtime_ns == 0
+
+    def test_overwrites_non_utf8_file(self, tmp_path):
+        from inventory_core import save_config, load_config
+        path = tmp_path / 'config.yaml'
+        path.write_bytes(b'items: [\xff]\n')
+        save_config({'items': ['cucumbers']}, str(path))
+        assert load_config(str(path)) == {'items': ['cucumbers']}